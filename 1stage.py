@@ -2,11 +2,11 @@
 import sys
 import os
 import argparse
-from urllib.parse import urlparse
+from urllib.parse import urlsplit
 
 
-def parse_args() -> argparse.Namespace:
-    """Парсинг аргументов командной строки"""
+def _build_parser() -> argparse.ArgumentParser:
+    """Построить парсер аргументов командной строки"""
     parser = argparse.ArgumentParser(
         description="Инструмент визуализации графа зависимостей (Этап 1)"
     )
@@ -49,13 +49,21 @@ def parse_args() -> argparse.Namespace:
         help="Максимальная глубина анализа зависимостей (по умолчанию: 10)"
     )
 
-    return parser.parse_args()
+    return parser
+
+
+_PARSER = _build_parser()
+
+
+def parse_args() -> argparse.Namespace:
+    """Парсинг аргументов командной строки"""
+    return _PARSER.parse_args()
 
 
 def is_url(s: str) -> bool:
     """Проверка, является ли строка валидным URL"""
     try:
-        parsed = urlparse(s)
+        parsed = urlsplit(s)
         return parsed.scheme in ("http", "https") and bool(parsed.netloc)
     except Exception:
         return False
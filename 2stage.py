@@ -1,42 +1,108 @@
 import sys
 import argparse
-import urllib.request
+import urllib.error
+import http.client
+import gzip
 import json
+import time
+from pathlib import Path
+from typing import List, Optional
 
 
-def parse_args():
+# Постоянное HTTPS-соединение с crates.io (keep-alive + gzip)
+API_HOST = "crates.io"
+API_HEADERS = {'User-Agent': 'dependency-visualizer', 'Accept-Encoding': 'gzip'}
+_connection = None
+
+# Дисковый кэш ответов crates.io
+CACHE_DIR = Path.home() / ".cache" / "dep-visualizer" / "crates.io"
+CACHE_TTL = 24 * 60 * 60
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    """Построить парсер аргументов командной строки"""
     parser = argparse.ArgumentParser(description="Инструмент визуализации графа зависимостей (Этап 2)")
     parser.add_argument("--package", "-p", required=True, help="Имя анализируемого пакета")
-    return parser.parse_args()
+    return parser
+
+
+_PARSER = _build_parser()
+
+
+def parse_args():
+    return _PARSER.parse_args()
+
+
+def api_get(path: str) -> bytes:
+    """GET-запрос к crates.io API с повторным использованием соединения"""
+    global _connection
+    if _connection is None:
+        _connection = http.client.HTTPSConnection(API_HOST, timeout=10)
+    conn = _connection
+
+    # Сервер мог закрыть простаивающее соединение - одна повторная попытка
+    for attempt in range(2):
+        try:
+            conn.request('GET', path, headers=API_HEADERS)
+            response = conn.getresponse()
+            body = response.read()
+            break
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            if attempt:
+                raise
+
+    if response.status != 200:
+        raise urllib.error.HTTPError(f"https://{API_HOST}{path}", response.status,
+                                     response.reason, response.headers, None)
+
+    if response.getheader('Content-Encoding') == 'gzip':
+        body = gzip.decompress(body)
+    return body
+
+
+def load_cached_dependencies(package_name: str) -> Optional[List[str]]:
+    """Прочитать зависимости пакета из дискового кэша, если он не устарел"""
+    cache_file = CACHE_DIR / f"{package_name}.json"
+    try:
+        if time.time() - cache_file.stat().st_mtime < CACHE_TTL:
+            return json.loads(cache_file.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def save_cached_dependencies(package_name: str, dependencies: List[str]):
+    """Сохранить зависимости пакета в дисковый кэш"""
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cache_file = CACHE_DIR / f"{package_name}.json"
+        cache_file.write_text(json.dumps(dependencies), encoding='utf-8')
+    except OSError:
+        pass
 
 
 def get_dependencies_from_crates_io(package_name):
     """Получить зависимости пакета через crates.io API"""
-    versions_url = f"https://crates.io/api/v1/crates/{package_name}/versions"
+    cached = load_cached_dependencies(package_name)
+    if cached is not None:
+        return cached
 
-    try:
-        req = urllib.request.Request(versions_url)
-        req.add_header('User-Agent', 'dependency-visualizer')
+    crate_path = f"/api/v1/crates/{package_name}"
 
-        with urllib.request.urlopen(req) as response:
-            data = json.loads(response.read().decode('utf-8'))
+    try:
+        data = json.loads(api_get(crate_path).decode('utf-8'))
 
-        # Получаем последнюю версию пакета
-        versions = data.get('versions', [])
-        if not versions:
+        # Последняя стабильная версия (или просто последняя, если стабильных нет)
+        crate = data.get('crate', {})
+        version_num = crate.get('max_stable_version') or crate.get('max_version')
+        if not version_num or version_num == '0.0.0':
+            save_cached_dependencies(package_name, [])
             return []
 
-        # Берем первую версию (самая новая)
-        latest_version = versions[0]
-        version_num = latest_version['num']
-
         # Получаем зависимости конкретной версии
-        deps_url = f"https://crates.io/api/v1/crates/{package_name}/{version_num}/dependencies"
-        req_deps = urllib.request.Request(deps_url)
-        req_deps.add_header('User-Agent', 'dependency-visualizer')
-
-        with urllib.request.urlopen(req_deps) as response:
-            deps_data = json.loads(response.read().decode('utf-8'))
+        deps_path = f"/api/v1/crates/{package_name}/{version_num}/dependencies"
+        deps_data = json.loads(api_get(deps_path).decode('utf-8'))
 
         dependencies = []
         for dep in deps_data.get('dependencies', []):
@@ -44,6 +110,7 @@ def get_dependencies_from_crates_io(package_name):
             if dep.get('kind') == 'normal':
                 dependencies.append(dep['crate_id'])
 
+        save_cached_dependencies(package_name, dependencies)
         return dependencies
 
     except urllib.error.HTTPError as e:
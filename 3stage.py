@@ -1,17 +1,56 @@
 import sys
 import argparse
-import urllib.request
+import urllib.error
+import http.client
+import gzip
+import threading
 import json
-from typing import Dict, Set, List
+import re
+import functools
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Set, List, Tuple, Iterator, Optional
 
+try:
+    # orjson разбирает bytes напрямую и заметно быстрее стандартного json
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
 
-def parse_args():
+
+# Число одновременных запросов к crates.io
+MAX_WORKERS = 32
+
+# Постоянное HTTPS-соединение с crates.io (keep-alive + gzip)
+API_HOST = "crates.io"
+API_HEADERS = {'User-Agent': 'dependency-visualizer', 'Accept-Encoding': 'gzip'}
+_local = threading.local()
+
+# Строка тестового репозитория "пакет: зав1, зав2" (комментарии "#" пропускаются,
+# строки с несколькими ":" не совпадают)
+_LINE_RE = re.compile(r'^(?![^\S\n]*#)([^:\n]*)(?::([^:\n]*))?$', re.MULTILINE)
+
+# Дисковый кэш ответов crates.io
+CACHE_DIR = Path.home() / ".cache" / "dep-visualizer" / "crates.io"
+CACHE_TTL = 24 * 60 * 60
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    """Построить парсер аргументов командной строки"""
     parser = argparse.ArgumentParser(description="Инструмент визуализации графа зависимостей (Этап 3)")
     parser.add_argument("--package", "-p", required=True, help="Имя анализируемого пакета")
     parser.add_argument("--repo", "-r", help="Путь к файлу тестового репозитория")
     parser.add_argument("--mode", "-m", choices=["real", "test"], default="real", help="Режим работы")
     parser.add_argument("--depth", "-d", type=int, default=10, help="Максимальная глубина анализа")
-    return parser.parse_args()
+    return parser
+
+
+_PARSER = _build_parser()
+
+
+def parse_args():
+    return _PARSER.parse_args()
 
 
 def load_test_repo(file_path: str) -> Dict[str, List[str]]:
@@ -19,66 +58,105 @@ def load_test_repo(file_path: str) -> Dict[str, List[str]]:
     graph = {}
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-
-                parts = line.split(':')
-                if len(parts) == 2:
-                    package = parts[0].strip()
-                    deps_str = parts[1].strip()
-                    deps = [d.strip() for d in deps_str.split(',') if d.strip()]
-                    graph[package] = deps
-                elif len(parts) == 1:
-                    package = parts[0].strip()
-                    graph[package] = []
+            content = f.read()
+
+        for m in _LINE_RE.finditer(content):
+            package, deps_str = m.groups()
+            package = package.strip()
+            if deps_str is None and not package:
+                continue  # пустая строка
+            graph[package] = [d.strip() for d in (deps_str or '').split(',') if d.strip()]
     except Exception as e:
         raise Exception(f"Ошибка чтения файла: {e}")
 
     return graph
 
 
-def get_dependencies_from_crates_io(package_name: str) -> List[str]:
-    """Получить зависимости пакета через crates.io API"""
-    versions_url = f"https://crates.io/api/v1/crates/{package_name}/versions"
+def api_get(path: str) -> bytes:
+    """GET-запрос к crates.io API с повторным использованием соединения"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = _local.conn = http.client.HTTPSConnection(API_HOST, timeout=10)
+
+    # Сервер мог закрыть простаивающее соединение - одна повторная попытка
+    for attempt in range(2):
+        try:
+            conn.request('GET', path, headers=API_HEADERS)
+            response = conn.getresponse()
+            body = response.read()
+            break
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            if attempt:
+                raise
+
+    if response.status != 200:
+        raise urllib.error.HTTPError(f"https://{API_HOST}{path}", response.status,
+                                     response.reason, response.headers, None)
+
+    if response.getheader('Content-Encoding') == 'gzip':
+        body = gzip.decompress(body)
+    return body
+
+
+def load_cached_dependencies(package_name: str) -> Optional[List[str]]:
+    """Прочитать зависимости пакета из дискового кэша, если он не устарел"""
+    cache_file = CACHE_DIR / f"{package_name}.json"
+    try:
+        if time.time() - cache_file.stat().st_mtime < CACHE_TTL:
+            return json.loads(cache_file.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        pass
+    return None
+
 
+def save_cached_dependencies(package_name: str, dependencies: List[str]):
+    """Сохранить зависимости пакета в дисковый кэш"""
     try:
-        req = urllib.request.Request(versions_url)
-        req.add_header('User-Agent', 'dependency-visualizer')
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cache_file = CACHE_DIR / f"{package_name}.json"
+        cache_file.write_text(json.dumps(dependencies), encoding='utf-8')
+    except OSError:
+        pass
+
 
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = json.loads(response.read().decode('utf-8'))
+@functools.lru_cache(maxsize=4096)
+def get_dependencies_from_crates_io(package_name: str) -> Tuple[str, ...]:
+    """Получить зависимости пакета через crates.io API"""
+    cached = load_cached_dependencies(package_name)
+    if cached is not None:
+        return tuple(cached)
 
-        versions = data.get('versions', [])
-        if not versions:
-            return []
+    crate_path = f"/api/v1/crates/{package_name}"
 
-        latest_version = versions[0]
-        version_num = latest_version['num']
+    try:
+        data = json_loads(api_get(crate_path))
 
-        deps_url = f"https://crates.io/api/v1/crates/{package_name}/{version_num}/dependencies"
-        req_deps = urllib.request.Request(deps_url)
-        req_deps.add_header('User-Agent', 'dependency-visualizer')
+        crate = data.get('crate', {})
+        version_num = crate.get('max_stable_version') or crate.get('max_version')
+        if not version_num or version_num == '0.0.0':
+            save_cached_dependencies(package_name, [])
+            return ()
 
-        with urllib.request.urlopen(req_deps, timeout=10) as response:
-            deps_data = json.loads(response.read().decode('utf-8'))
+        deps_path = f"/api/v1/crates/{package_name}/{version_num}/dependencies"
+        deps_data = json_loads(api_get(deps_path))
 
         dependencies = []
         for dep in deps_data.get('dependencies', []):
             if dep.get('kind') == 'normal':
                 dependencies.append(dep['crate_id'])
 
-        return dependencies
+        save_cached_dependencies(package_name, dependencies)
+        return tuple(dependencies)
 
     except urllib.error.HTTPError as e:
         if e.code == 404:
-            return []
+            return ()
         else:
             raise Exception(f"HTTP ошибка для {package_name}: {e.code}")
     except Exception as e:
         print(f"Предупреждение: не удалось получить зависимости для {package_name}: {e}")
-        return []
+        return ()
 
 
 class DependencyGraph:
@@ -87,10 +165,15 @@ class DependencyGraph:
         self.repo = repo
         self.max_depth = max_depth
 
-        self.graph: Dict[str, Set[str]] = {}
+        self.graph: Dict[str, List[str]] = {}
         self.visited: Set[str] = set()
-        self.in_progress: Set[str] = set()
+        # Текущий путь DFS и позиция каждого пакета в нем (для поиска циклов)
+        self._path: List[str] = []
+        self._path_idx: Dict[str, int] = {}
+        self._stack: List[Tuple[str, Iterator[str], int]] = []
         self.cycles: List[List[str]] = []
+        self._deps_cache: Dict[str, List[str]] = {}
+        self._sorted_keys: Optional[List[str]] = None
 
         if mode == "test":
             self.test_graph = load_test_repo(repo)
@@ -99,46 +182,92 @@ class DependencyGraph:
         """Получить зависимости пакета"""
         if self.mode == "test":
             return self.test_graph.get(package, [])
-        else:
-            return get_dependencies_from_crates_io(package)
-
-    def dfs(self, package: str, depth: int, path: List[str]):
-        """DFS для построения графа зависимостей"""
+        if package not in self._deps_cache:
+            self._deps_cache[package] = list(get_dependencies_from_crates_io(package))
+        return self._deps_cache[package]
+
+    def prefetch(self, root_package: str):
+        """Загрузить зависимости пакетов по уровням BFS, каждый уровень - параллельно"""
+        frontier = [root_package]
+        seen = {root_package}
+        depth = 0
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            while frontier:
+                results = executor.map(get_dependencies_from_crates_io, frontier)
+                next_frontier = []
+                for package, deps in zip(frontier, results):
+                    deps = list(deps)
+                    self._deps_cache[package] = deps
+                    if depth < self.max_depth:
+                        for dep in deps:
+                            if dep not in seen:
+                                seen.add(dep)
+                                next_frontier.append(dep)
+                frontier = next_frontier
+                depth += 1
+
+    def _enter(self, package: str, depth: int):
+        """Войти в пакет: зафиксировать цикл или положить пакет на стек DFS"""
         if depth > self.max_depth:
             return
 
-        if package in self.in_progress:
-            cycle_start = path.index(package)
-            cycle = path[cycle_start:] + [package]
+        if package in self._path_idx:
+            cycle = self._path[self._path_idx[package]:] + [package]
             self.cycles.append(cycle)
             return
 
         if package in self.visited:
             return
 
-        self.in_progress.add(package)
-        path.append(package)
-
-        deps = self.get_deps(package)
+        self._path_idx[package] = len(self._path)
+        self._path.append(package)
 
-        if package not in self.graph:
-            self.graph[package] = set()
+        # Каждый пакет раскрывается один раз: список смежности заполняется целиком,
+        # повторы убираются через dict.fromkeys с сохранением порядка
+        deps = list(dict.fromkeys(self.get_deps(package)))
+        self.graph[package] = deps
 
-        for dep in deps:
-            self.graph[package].add(dep)
-            self.dfs(dep, depth + 1, path[:])
+        self._stack.append((package, iter(deps), depth))
 
-        path.pop()
-        self.in_progress.remove(package)
+    def _leave(self):
+        """Выйти из пакета на вершине стека DFS"""
+        package, _, _ = self._stack.pop()
+        del self._path_idx[self._path.pop()]
         self.visited.add(package)
 
+    def dfs(self, root_package: str):
+        """Итеративный DFS для построения графа зависимостей"""
+        self._enter(root_package, 0)
+        while self._stack:
+            _, deps_iter, depth = self._stack[-1]
+            try:
+                dep = next(deps_iter)
+            except StopIteration:
+                self._leave()
+                continue
+
+            self._enter(dep, depth + 1)
+
     def build(self, root_package: str):
         """Построить граф зависимостей"""
-        self.dfs(root_package, 0, [])
+        if self.mode == "real":
+            self.prefetch(root_package)
+        self.dfs(root_package)
+
+        # Списки зависимостей сортируются один раз после построения
+        for deps in self.graph.values():
+            deps.sort()
+        self._sorted_keys = None
+
+    def sorted_packages(self) -> List[str]:
+        """Пакеты графа в отсортированном порядке (вычисляется один раз)"""
+        if self._sorted_keys is None:
+            self._sorted_keys = sorted(self.graph)
+        return self._sorted_keys
 
 
-def print_graph(graph: Dict[str, Set[str]], root: str):
-    """Вывести граф зависимостей"""
+def print_graph(graph: Dict[str, List[str]], root: str, packages: List[str]):
+    """Вывести граф зависимостей (списки зависимостей уже отсортированы)"""
     print(f"\nГраф зависимостей для '{root}':")
     print("=" * 50)
 
@@ -146,11 +275,11 @@ def print_graph(graph: Dict[str, Set[str]], root: str):
         print("(нет зависимостей)")
         return
 
-    for package in sorted(graph.keys()):
+    for package in packages:
         deps = graph[package]
         if deps:
             print(f"{package}:")
-            for dep in sorted(deps):
+            for dep in deps:
                 print(f"  -> {dep}")
         else:
             print(f"{package}: (нет зависимостей)")
@@ -177,7 +306,7 @@ def main():
         dg = DependencyGraph(args.mode, args.repo, args.depth)
         dg.build(args.package)
 
-        print_graph(dg.graph, args.package)
+        print_graph(dg.graph, args.package, dg.sorted_packages())
 
         if dg.cycles:
             print(f"\nОбнаружено циклических зависимостей: {len(dg.cycles)}")